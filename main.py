@@ -1,37 +1,354 @@
 import os
 import time
+import asyncio
+import atexit
+import functools
+import json
 import mimetypes
-from pathlib import Path
+import pickle
+import queue
+import random
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import httplib2
+import google_auth_httplib2
 from googleapiclient.discovery import build
+from googleapiclient.errors import HttpError
 from googleapiclient.http import MediaFileUpload
 from google.auth.transport.requests import Request
 from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import InstalledAppFlow
+
+# Optional: constant-memory duplicate detection for very large folders
+try:
+    from pybloom_live import ScalableBloomFilter
+except ImportError:
+    ScalableBloomFilter = None
 import logging
+import logging.handlers
 import sys
 
-# Set up logging
+# Set up logging: worker threads enqueue records non-blockingly and a
+# single listener thread drains them to the file and stderr, so the
+# handlers' locks and disk writes never serialize the upload workers
+_log_queue = queue.Queue(-1)
+_log_formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
+_file_handler = logging.FileHandler('upload_bot.log')
+_file_handler.setFormatter(_log_formatter)
+_stream_handler = logging.StreamHandler()
+_stream_handler.setFormatter(_log_formatter)
+
 logging.basicConfig(
     level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('upload_bot.log'),
-        logging.StreamHandler()
-    ]
+    handlers=[logging.handlers.QueueHandler(_log_queue)]
 )
+_log_listener = logging.handlers.QueueListener(_log_queue, _file_handler, _stream_handler)
+_log_listener.start()
+# Drain the queue on exit; the listener thread is a daemon, so records
+# logged just before the process ends (like the upload summary) would
+# otherwise be dropped
+atexit.register(_log_listener.stop)
+
+@functools.lru_cache(maxsize=256)
+def _mime_for_suffix(suffix):
+    """Return the MIME type for a lowercased file suffix.
+
+    Cached so homogeneous trees (thousands of '.jpg' files) pay the
+    lookup once instead of per file.
+    """
+    return mimetypes.types_map.get(suffix) or 'application/octet-stream'
+
+
+def _q_escape(s):
+    """Escape a value for interpolation into a Drive query string.
+
+    Apostrophes in names would otherwise terminate the quoted literal,
+    silently breaking existence checks.
+    """
+    return s.replace("\\", "\\\\").replace("'", "\\'")
+
+
+def _scandir_walk(root, ext_set):
+    """Yield file paths under root using an os.scandir stack.
+
+    DirEntry.is_file() answers from cached dirent data, avoiding the
+    per-entry stat() that Path.rglob pays, and yielding plain strings
+    skips a PurePath allocation per file.
+    """
+    stack = [root]
+    while stack:
+        current = stack.pop()
+        try:
+            with os.scandir(current) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif entry.is_file(follow_symlinks=False):
+                        if ext_set is None or (
+                                '.' in entry.name
+                                and entry.name.rpartition('.')[2].lower() in ext_set):
+                            yield entry.path
+        except OSError as e:
+            logging.warning(f"Skipping unreadable directory '{current}': {str(e)}")
+
+
+class TokenBucket:
+    """Thread-safe token bucket used to pace Drive API writes.
+
+    Tokens refill continuously at `rate` per second up to `capacity`,
+    so uploads proceed at a steady pace instead of stalling in long
+    fixed-length breaks.
+    """
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a token is available, then consume it."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+            self._last = now
+            if self._tokens < 1:
+                time.sleep((1 - self._tokens) / self.rate)
+                self._last = time.monotonic()
+                self._tokens = 0
+            else:
+                self._tokens -= 1
+
+
+class DriveIndex:
+    """Local SQLite cache of Drive folder contents across runs.
+
+    Remembers which file names each destination folder already holds so
+    warm runs can skip the prefetch listing entirely, plus the Changes
+    API page token used to pick up external modifications without
+    re-listing the folder.
+    """
+
+    def __init__(self, db_path=None):
+        if db_path is None:
+            db_path = os.path.join(os.path.expanduser('~'), '.cache', 'upload_bot', 'index.db')
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS files (folder_id TEXT, name TEXT, PRIMARY KEY (folder_id, name))')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS changes (folder_id TEXT PRIMARY KEY, page_token TEXT)')
+        self._conn.commit()
+
+    def load_names(self, folder_id):
+        """Return the cached set of file names for a folder"""
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT name FROM files WHERE folder_id = ?', (folder_id,)).fetchall()
+        return {row[0] for row in rows}
+
+    def add_name(self, folder_id, name):
+        """Record one file name for a folder"""
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR IGNORE INTO files VALUES (?, ?)', (folder_id, name))
+            self._conn.commit()
+
+    def add_names(self, folder_id, names):
+        """Record many file names for a folder"""
+        with self._lock:
+            self._conn.executemany(
+                'INSERT OR IGNORE INTO files VALUES (?, ?)',
+                [(folder_id, name) for name in names])
+            self._conn.commit()
+
+    def remove_name(self, folder_id, name):
+        """Forget one file name for a folder"""
+        with self._lock:
+            self._conn.execute(
+                'DELETE FROM files WHERE folder_id = ? AND name = ?', (folder_id, name))
+            self._conn.commit()
+
+    def get_page_token(self, folder_id):
+        """Return the stored Changes API page token for a folder, if any"""
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT page_token FROM changes WHERE folder_id = ?', (folder_id,)).fetchone()
+        return row[0] if row else None
+
+    def set_page_token(self, folder_id, page_token):
+        """Store the Changes API page token for a folder"""
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO changes VALUES (?, ?)', (folder_id, page_token))
+            self._conn.commit()
+
+
+class AsyncTokenBucket:
+    """asyncio counterpart of TokenBucket; awaits instead of sleeping."""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._last = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        """Wait until a token is available, then consume it."""
+        async with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+            self._last = now
+            if self._tokens < 1:
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+                self._last = time.monotonic()
+                self._tokens = 0
+            else:
+                self._tokens -= 1
+
+
+class AsyncDriveUploader:
+    """Optional asyncio upload path for high-concurrency workloads.
+
+    Posts multipart bodies straight to the Drive REST upload endpoint
+    over a single pooled aiohttp ClientSession, so hundreds of uploads
+    can be in flight without a thread or service object per worker.
+    Writes are paced by a token bucket and transient errors retried with
+    backoff, mirroring the sync path. The multipart endpoint sends the
+    whole file in one request, so this path suits large numbers of
+    small files; requires the optional aiohttp dependency
+    (pip install aiohttp).
+    """
+
+    UPLOAD_URL = 'https://www.googleapis.com/upload/drive/v3/files?uploadType=multipart'
+    # HTTP statuses worth retrying: rate limits and transient server errors
+    RETRYABLE_STATUSES = (403, 429, 500, 502, 503, 504)
+
+    def __init__(self, creds, max_concurrency=32, on_success=None):
+        try:
+            import aiohttp  # noqa: F401
+        except ImportError:
+            raise ImportError("aiohttp is required for AsyncDriveUploader. "
+                              "Install it with: pip install aiohttp")
+        self.creds = creds
+        self.max_concurrency = max_concurrency
+        # Called (thread-safely, off the loop) with each uploaded file
+        # name so the owner can record it for duplicate detection
+        self.on_success = on_success
+        # Same pacing as the sync path: 8 writes/sec, burst of 10
+        self._limiter = AsyncTokenBucket(rate=8.0, capacity=10)
+
+    def _bearer_token(self):
+        """Return a fresh OAuth bearer token, refreshing if expired"""
+        if not self.creds.valid:
+            self.creds.refresh(Request())
+        return self.creds.token
+
+    def _multipart_body(self, file_name, drive_folder_id, mime_type, data):
+        """Build the multipart/related body the upload endpoint expects:
+        JSON metadata part first, then the file content."""
+        import aiohttp
+
+        writer = aiohttp.MultipartWriter('related')
+        writer.append(json.dumps({'name': file_name, 'parents': [drive_folder_id]}),
+                      {'Content-Type': 'application/json; charset=UTF-8'})
+        writer.append(data, {'Content-Type': mime_type})
+        return writer
+
+    async def upload_all(self, file_paths, drive_folder_id='root'):
+        """Upload all files concurrently; returns (successes, failures)"""
+        import aiohttp
+
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        connector = aiohttp.TCPConnector(limit=self.max_concurrency)
+        async with aiohttp.ClientSession(connector=connector) as session:
+            results = await asyncio.gather(*(
+                self._upload_one(session, semaphore, str(file_path), drive_folder_id)
+                for file_path in file_paths
+            ))
+        successes = sum(results)
+        return successes, len(results) - successes
+
+    async def _upload_one(self, session, semaphore, file_path, drive_folder_id,
+                          max_attempts=5):
+        file_name = os.path.basename(file_path)
+        mime_type = _mime_for_suffix(os.path.splitext(file_path)[1].lower())
+
+        async with semaphore:
+            try:
+                # Read off the event loop so disk I/O doesn't block other uploads
+                data = await asyncio.to_thread(self._read_file, file_path)
+
+                for attempt in range(max_attempts):
+                    # Pace writes so concurrent uploads stay under quota
+                    await self._limiter.acquire()
+                    # Token refresh blocks on the network, so keep it off the loop
+                    token = await asyncio.to_thread(self._bearer_token)
+                    headers = {'Authorization': f'Bearer {token}'}
+                    # The body is consumed by each attempt, so rebuild it
+                    body = self._multipart_body(file_name, drive_folder_id, mime_type, data)
+
+                    async with session.post(self.UPLOAD_URL, data=body, headers=headers) as resp:
+                        if resp.status == 200:
+                            if self.on_success is not None:
+                                # Recording touches SQLite; keep it off the loop
+                                await asyncio.to_thread(self.on_success, file_name)
+                            logging.debug(f"Successfully uploaded: {file_name}")
+                            return True
+                        text = await resp.text()
+                        if resp.status in self.RETRYABLE_STATUSES and attempt < max_attempts - 1:
+                            delay = (2 ** attempt) + random.uniform(0, 1)
+                            logging.warning(f"Drive API error {resp.status}, retrying in {delay:.1f}s "
+                                            f"(attempt {attempt + 1}/{max_attempts})")
+                            await asyncio.sleep(delay)
+                            continue
+                        logging.error(f"Error uploading {file_path}: HTTP {resp.status} {text[:200]}")
+                        return False
+                return False
+            except Exception as e:
+                logging.error(f"Error uploading {file_path}: {str(e)}")
+                return False
+
+    @staticmethod
+    def _read_file(file_path):
+        with open(file_path, 'rb') as f:
+            return f.read()
+
 
 class GoogleDriveUploadBot:
-    def __init__(self, credentials_file='credentials.json', token_file='token.json'):
+    # HTTP statuses worth retrying: rate limits and transient server errors
+    RETRYABLE_STATUSES = (403, 429, 500, 502, 503, 504)
+
+    def __init__(self, credentials_file='credentials.json', token_file='token.json', max_workers=4,
+                 resumable_threshold=5 * 1024 * 1024, index=None):
         self.SCOPES = ['https://www.googleapis.com/auth/drive.file']
         self.credentials_file = credentials_file
         self.token_file = token_file
-        self.service = self._authenticate()
+        self.creds = self._authenticate()
+        self.service = self._build_service()
         self.uploaded_count = 0
-        self.batch_size = 10
-        self.break_duration = 180  # 180 seconds (3 minutes)
-        
+        self.batch_size = 10  # controls how far the walk runs ahead of the uploads
+        self.max_workers = max_workers
+        # 8 writes/sec with a burst of 10 stays safely under Drive's
+        # 10 requests/sec per-user write quota
+        self._limiter = TokenBucket(rate=8.0, capacity=10)
+        self._thread_local = threading.local()
+        # Dedup state is scoped per destination folder id: a name existing
+        # in folder A must not suppress an upload into folder B
+        self._existing_names = {}  # folder_id -> set of names
+        self._names_lock = threading.Lock()
+        self.resumable_threshold = resumable_threshold  # files below this upload in one request
+        self.upload_chunksize = 50 * 1024 * 1024  # chunk size for resumable uploads
+        self.index = index if index is not None else DriveIndex()
+        self._blooms = {}  # folder_id -> Bloom filter
+        self._bloom_adds = {}  # folder_id -> adds since last checkpoint
+
     def _authenticate(self):
-        """Authenticate and return Google Drive service object"""
+        """Authenticate and return Google Drive credentials"""
         creds = None
         
         # Check if token file exists
@@ -54,34 +371,323 @@ class GoogleDriveUploadBot:
             with open(self.token_file, 'w') as token:
                 token.write(creds.to_json())
         
-        return build('drive', 'v3', credentials=creds)
-    
-    def get_files_to_upload(self, local_folder_path, file_extensions=None):
-        """Get list of files to upload from local folder"""
+        return creds
+
+    def _build_service(self):
+        """Build a Drive service over an explicit keep-alive transport.
+
+        httplib2.Http holds its sockets open between calls, so every
+        request a thread makes after its first reuses the same TLS
+        connection instead of paying a fresh handshake. Discovery
+        caching is disabled since each build would hit it anyway.
+        """
+        authed_http = google_auth_httplib2.AuthorizedHttp(
+            self.creds, http=httplib2.Http(timeout=120))
+        return build('drive', 'v3', http=authed_http, cache_discovery=False)
+
+    def _get_service(self):
+        """Get a Drive service object for the current thread.
+
+        Service objects built by googleapiclient are not thread-safe, so
+        each worker thread lazily builds its own from the shared credentials.
+        """
+        if not hasattr(self._thread_local, 'service'):
+            self._thread_local.service = self._build_service()
+        return self._thread_local.service
+
+    def _retry(self, fn, *args, max_attempts=5, **kwargs):
+        """Run a Drive API call with exponential backoff on transient errors.
+
+        Rate-limit 403/429s and 5xx responses are retried with jittered
+        exponential delays; anything else is re-raised immediately.
+        """
+        for attempt in range(max_attempts):
+            try:
+                return fn(*args, **kwargs)
+            except HttpError as e:
+                status = e.resp.status
+                if status not in self.RETRYABLE_STATUSES or attempt == max_attempts - 1:
+                    raise
+                delay = (2 ** attempt) + random.uniform(0, 1)
+                logging.warning(f"Drive API error {status}, retrying in {delay:.1f}s "
+                                f"(attempt {attempt + 1}/{max_attempts})")
+                time.sleep(delay)
+
+    def _list_all(self, q, fields):
+        """Yield every result for a Drive query, following page tokens.
+
+        A single files().list call silently truncates at the first page
+        (100 items by default); this pages through at the Drive maximum
+        page size until the listing is exhausted. Uses the per-thread
+        service so callers can run listings in parallel.
+        """
+        service = self._get_service()
+        page_token = None
+        while True:
+            results = self._retry(service.files().list(
+                q=q,
+                fields=f"nextPageToken, {fields}",
+                pageSize=1000,
+                pageToken=page_token
+            ).execute)
+            yield from results.get('files', [])
+            page_token = results.get('nextPageToken')
+            if not page_token:
+                return
+
+    def _bloom_file(self, folder_id):
+        """Path of the persistent Bloom filter for a folder"""
+        return os.path.join(
+            os.path.expanduser('~'), '.cache', 'upload_bot', f'{folder_id}.bloom')
+
+    def _load_bloom(self, folder_id):
+        """Load (or create) the persistent Bloom filter for a folder.
+
+        Returns True when a filter from a previous run was loaded, so
+        the caller can skip re-seeding it. No-op when pybloom-live is
+        not installed; the exact name set is used instead.
+        """
+        if ScalableBloomFilter is None:
+            return False
+        path = self._bloom_file(folder_id)
+        if os.path.exists(path):
+            try:
+                with open(path, 'rb') as f:
+                    self._blooms[folder_id] = pickle.load(f)
+                return True
+            except Exception as e:
+                logging.warning(f"Discarding unreadable Bloom filter cache: {str(e)}")
+        self._blooms[folder_id] = ScalableBloomFilter(mode=ScalableBloomFilter.LARGE_SET_GROWTH)
+        return False
+
+    def _save_bloom(self, folder_id):
+        """Checkpoint a folder's Bloom filter to disk.
+
+        Serializing while another worker is mid-add could persist a torn
+        filter whose false negatives cause duplicate uploads next run,
+        so the snapshot is taken under _names_lock and only the (slow)
+        file write happens outside it. Callers must not hold the lock.
+        """
+        with self._names_lock:
+            bloom = self._blooms.get(folder_id)
+            if bloom is None:
+                return
+            payload = pickle.dumps(bloom)
+        path = self._bloom_file(folder_id)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(payload)
+
+    def _seed_bloom(self, folder_id, names):
+        """Populate a freshly created Bloom filter and checkpoint it"""
+        bloom = self._blooms.get(folder_id)
+        if bloom is None:
+            return
+        for name in names:
+            bloom.add(name)
+        self._save_bloom(folder_id)
+
+    def _file_exists_on_drive(self, file_name, folder_id):
+        """Confirm a Bloom-filter hit with a real listing call"""
+        query = f"name='{_q_escape(file_name)}' and '{folder_id}' in parents and trashed=false"
+        results = self._retry(self._get_service().files().list(
+            q=query, fields="files(id)", pageSize=1).execute)
+        return bool(results.get('files'))
+
+    def _known_duplicate(self, file_name, folder_id):
+        """Check the prefetched caches for a name already in the folder.
+
+        Set hits are exact; Bloom hits can be false positives and are
+        confirmed with a single listing call before a file is skipped.
+        """
+        with self._names_lock:
+            known = file_name in self._existing_names.get(folder_id, ())
+            bloom = self._blooms.get(folder_id)
+            bloom_hit = not known and bloom is not None and file_name in bloom
+        if not known and bloom_hit:
+            # Bloom hits can be false positives; confirm before skipping
+            known = self._file_exists_on_drive(file_name, folder_id)
+        return known
+
+    def _record_uploaded(self, folder_id, file_name):
+        """Record a successful upload so concurrent workers and future
+        runs skip the name."""
+        checkpoint = False
+        with self._names_lock:
+            bloom = self._blooms.get(folder_id)
+            if bloom is not None:
+                bloom.add(file_name)
+                adds = self._bloom_adds.get(folder_id, 0) + 1
+                self._bloom_adds[folder_id] = adds
+                checkpoint = adds % 1000 == 0
+            # Keep the exact set current too, unless this folder runs
+            # Bloom-only (no set was prefetched) to bound memory
+            if bloom is None or folder_id in self._existing_names:
+                self._existing_names.setdefault(folder_id, set()).add(file_name)
+        if checkpoint:
+            # _save_bloom takes _names_lock itself to snapshot safely,
+            # so it must be called after the lock is released
+            self._save_bloom(folder_id)
+        self.index.add_name(folder_id, file_name)
+
+    def _prefetch_existing(self, folder_id):
+        """Fetch the names of all files already in the Drive folder.
+
+        Warm runs load the listing from the local DriveIndex cache and
+        only replay Drive changes since the last run; a cold cache falls
+        back to one paginated listing, which still beats a files().list
+        call per upload. With pybloom-live installed, a persisted Bloom
+        filter supplements the exact set; only when the exact index is
+        empty does it stand alone, trading a confirmation listing per
+        Bloom hit for constant memory.
+        """
+        bloom_loaded = self._load_bloom(folder_id)
+
+        cached_names = self.index.load_names(folder_id)
+        if cached_names:
+            # Keep the exact set even when a Bloom filter is loaded: set
+            # hits skip the per-file confirmation call that Bloom hits pay
+            with self._names_lock:
+                self._existing_names.setdefault(folder_id, set()).update(cached_names)
+            self._refresh_from_changes(folder_id)
+            if not bloom_loaded:
+                self._seed_bloom(folder_id, cached_names)
+            logging.info(f"Loaded {len(cached_names)} existing file names from local cache")
+            return
+
+        if bloom_loaded:
+            # Per-upload index writes will warm the SQLite cache, so later
+            # runs take the exact-set branch above; without a stored token
+            # their changes replay would bail and never evict deletions
+            if not self.index.get_page_token(folder_id):
+                start = self._retry(self._get_service().changes().getStartPageToken().execute)
+                self.index.set_page_token(folder_id, start.get('startPageToken'))
+            logging.info("Loaded Bloom filter from previous run; skipping prefetch listing")
+            return
+
+        names = {f['name'] for f in self._list_all(
+            q=f"'{folder_id}' in parents and trashed=false", fields="files(name)")}
+        with self._names_lock:
+            self._existing_names.setdefault(folder_id, set()).update(names)
+        self.index.add_names(folder_id, names)
+        self._seed_bloom(folder_id, names)
+        start = self._retry(self._get_service().changes().getStartPageToken().execute)
+        self.index.set_page_token(folder_id, start.get('startPageToken'))
+        logging.info(f"Found {len(names)} existing files in destination folder")
+
+    def prefetch_existing_many(self, folder_ids):
+        """Prefetch the listings for several folders in parallel.
+
+        Each listing runs on its own thread (and per-thread service), so
+        warming the dedup set for a multi-folder hierarchy costs roughly
+        one listing's wall time instead of one per folder.
+        """
+        folder_ids = list(folder_ids)
+        if not folder_ids:
+            return
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(folder_ids))) as executor:
+            futures = [executor.submit(self._prefetch_existing, folder_id)
+                       for folder_id in folder_ids]
+            for future in as_completed(futures):
+                future.result()
+
+    def _refresh_from_changes(self, folder_id):
+        """Replay Drive changes since the last run into the cached listing.
+
+        Catches files added to — or trashed and moved out of — the folder
+        from outside this tool without paying for a full re-listing, so
+        a deleted file is re-uploaded instead of being skipped forever.
+        """
+        service = self._get_service()
+        page_token = self.index.get_page_token(folder_id)
+        if not page_token:
+            return
+        while page_token:
+            results = self._retry(service.changes().list(
+                pageToken=page_token,
+                fields="nextPageToken, newStartPageToken, "
+                       "changes(removed, fileId, file(name, parents, trashed))"
+            ).execute)
+            for change in results.get('changes', []):
+                changed = change.get('file')
+                if changed is None:
+                    # Permanent deletions (removed=true) carry no file
+                    # resource, and the cache is keyed by name, so the
+                    # stale row can only be corrected by a cold re-listing
+                    continue
+                name = changed.get('name')
+                if not name:
+                    continue
+                in_folder = (folder_id in (changed.get('parents') or [])
+                             and not changed.get('trashed')
+                             and not change.get('removed'))
+                if in_folder:
+                    with self._names_lock:
+                        self._existing_names.setdefault(folder_id, set()).add(name)
+                    self.index.add_name(folder_id, name)
+                else:
+                    # Trashed or moved out of the folder: drop it from the
+                    # cache so the file can be uploaded again
+                    with self._names_lock:
+                        self._existing_names.get(folder_id, set()).discard(name)
+                    self.index.remove_name(folder_id, name)
+            new_start = results.get('newStartPageToken')
+            page_token = results.get('nextPageToken')
+            if not page_token and new_start:
+                self.index.set_page_token(folder_id, new_start)
+
+    def iter_files_to_upload(self, local_folder_path, file_extensions=None):
+        """Yield files to upload from the local folder one at a time.
+
+        Streaming keeps memory O(1) on huge trees and lets the first
+        upload start before the walk finishes.
+        """
         if not os.path.exists(local_folder_path):
             raise FileNotFoundError(f"Local folder '{local_folder_path}' not found!")
-        
-        files_to_upload = []
-        path = Path(local_folder_path)
-        
-        # Get all files recursively
-        for file_path in path.rglob('*'):
-            if file_path.is_file():
-                # Filter by extensions if specified
-                if file_extensions is None or file_path.suffix.lower() in file_extensions:
-                    files_to_upload.append(file_path)
-        
+
+        # Normalize extensions once ('.JPG' -> 'jpg') so the walk does a
+        # single set lookup per file instead of suffix munging
+        ext_set = None
+        if file_extensions is not None:
+            ext_set = frozenset(ext.lower().lstrip('.') for ext in file_extensions)
+
+        yield from _scandir_walk(local_folder_path, ext_set)
+
+    def get_files_to_upload(self, local_folder_path, file_extensions=None):
+        """Get list of files to upload from local folder"""
+        files_to_upload = list(self.iter_files_to_upload(local_folder_path, file_extensions))
         logging.info(f"Found {len(files_to_upload)} files to upload")
         return files_to_upload
-    
+
+    def _walk_producer(self, local_folder_path, file_extensions, work_queue, sentinel,
+                       stop_event=None):
+        """Walk the local tree and feed file paths to the upload workers.
+
+        Runs in its own thread so directory traversal overlaps with the
+        network uploads instead of stalling them up front. Stops early
+        when stop_event is set (e.g. on Ctrl+C).
+        """
+        try:
+            for file_path in self.iter_files_to_upload(local_folder_path, file_extensions):
+                if stop_event is not None and stop_event.is_set():
+                    break
+                work_queue.put(file_path)
+        except Exception as e:
+            logging.error(f"Error walking '{local_folder_path}': {str(e)}")
+        finally:
+            # One sentinel per worker so every consumer shuts down
+            for _ in range(self.max_workers):
+                work_queue.put(sentinel)
+
     def create_drive_folder(self, folder_name, parent_folder_id='root'):
         """Create a folder in Google Drive"""
         try:
             # Check if folder already exists
-            query = f"name='{folder_name}' and parents='{parent_folder_id}' and mimeType='application/vnd.google-apps.folder'"
-            results = self.service.files().list(q=query, fields="files(id, name)").execute()
+            query = (f"name='{_q_escape(folder_name)}' and parents='{parent_folder_id}' "
+                     f"and mimeType='application/vnd.google-apps.folder'")
+            results = self._retry(self.service.files().list(q=query, fields="files(id)").execute)
             folders = results.get('files', [])
-            
+
             if folders:
                 logging.info(f"Folder '{folder_name}' already exists")
                 return folders[0]['id']
@@ -93,7 +699,7 @@ class GoogleDriveUploadBot:
                 'parents': [parent_folder_id]
             }
             
-            folder = self.service.files().create(body=folder_metadata, fields='id').execute()
+            folder = self._retry(self.service.files().create(body=folder_metadata, fields='id').execute)
             logging.info(f"Created folder '{folder_name}' with ID: {folder.get('id')}")
             return folder.get('id')
             
@@ -101,13 +707,74 @@ class GoogleDriveUploadBot:
             logging.error(f"Error creating folder: {str(e)}")
             return None
     
+    def ensure_folders(self, folder_names, parent_folder_id='root'):
+        """Resolve several Drive folders at once, creating any that are missing.
+
+        Drive forbids batching media uploads but allows batched metadata
+        calls, so the existence checks go out as one batched HTTP request
+        and the creations as a second — two round-trips total instead of
+        one per folder. Returns a dict mapping folder name to folder ID.
+        """
+        folder_ids = {}
+        failed_lookups = set()
+
+        def on_listed(request_id, response, exception):
+            if exception is not None:
+                # A per-item error is not "not found" — treating it as a
+                # miss would create a duplicate folder below
+                logging.warning(f"Batched lookup failed for folder '{request_id}': {str(exception)}")
+                failed_lookups.add(request_id)
+                return
+            folders = response.get('files', [])
+            if folders:
+                folder_ids[request_id] = folders[0]['id']
+
+        batch = self.service.new_batch_http_request(callback=on_listed)
+        for name in folder_names:
+            query = (f"name='{_q_escape(name)}' and parents='{parent_folder_id}' "
+                     f"and mimeType='application/vnd.google-apps.folder'")
+            batch.add(self.service.files().list(q=query, fields="files(id)"), request_id=name)
+        self._retry(batch.execute)
+
+        # Retry failed lookups individually with backoff; if one still
+        # fails, _retry raises and we bail out rather than guess
+        for name in sorted(failed_lookups):
+            query = (f"name='{_q_escape(name)}' and parents='{parent_folder_id}' "
+                     f"and mimeType='application/vnd.google-apps.folder'")
+            results = self._retry(self.service.files().list(q=query, fields="files(id)").execute)
+            folders = results.get('files', [])
+            if folders:
+                folder_ids[name] = folders[0]['id']
+
+        missing = [name for name in folder_names if name not in folder_ids]
+        if missing:
+            def on_created(request_id, response, exception):
+                if exception is not None:
+                    logging.error(f"Error creating folder '{request_id}': {str(exception)}")
+                    return
+                folder_ids[request_id] = response.get('id')
+
+            batch = self.service.new_batch_http_request(callback=on_created)
+            for name in missing:
+                folder_metadata = {
+                    'name': name,
+                    'mimeType': 'application/vnd.google-apps.folder',
+                    'parents': [parent_folder_id]
+                }
+                batch.add(self.service.files().create(body=folder_metadata, fields='id'), request_id=name)
+            self._retry(batch.execute)
+            logging.info(f"Created {len(missing)} folders in one batch")
+
+        return folder_ids
+
     def get_folder_id_by_name(self, folder_name, parent_folder_id='root'):
         """Find a folder ID by name"""
         try:
-            query = f"name='{folder_name}' and parents='{parent_folder_id}' and mimeType='application/vnd.google-apps.folder'"
-            results = self.service.files().list(q=query, fields="files(id, name)").execute()
+            query = (f"name='{_q_escape(folder_name)}' and parents='{parent_folder_id}' "
+                     f"and mimeType='application/vnd.google-apps.folder'")
+            results = self._retry(self.service.files().list(q=query, fields="files(id)").execute)
             folders = results.get('files', [])
-            
+
             if folders:
                 folder_id = folders[0]['id']
                 logging.info(f"Found folder '{folder_name}' with ID: {folder_id}")
@@ -124,8 +791,7 @@ class GoogleDriveUploadBot:
         """List all folders in the parent folder"""
         try:
             query = f"parents='{parent_folder_id}' and mimeType='application/vnd.google-apps.folder'"
-            results = self.service.files().list(q=query, fields="files(id, name)").execute()
-            folders = results.get('files', [])
+            folders = list(self._list_all(q=query, fields="files(id, name)"))
             
             if not folders:
                 print("No folders found.")
@@ -146,21 +812,16 @@ class GoogleDriveUploadBot:
     def upload_file(self, file_path, drive_folder_id='root'):
         """Upload a single file to Google Drive"""
         try:
+            service = self._get_service()
             file_name = os.path.basename(file_path)
-            
-            # Check if file already exists in Drive
-            query = f"name='{file_name}' and parents='{drive_folder_id}'"
-            results = self.service.files().list(q=query, fields="files(id, name)").execute()
-            existing_files = results.get('files', [])
-            
-            if existing_files:
-                logging.info(f"File '{file_name}' already exists in Drive, skipping...")
+
+            # Check against the prefetched listing instead of hitting the API
+            if self._known_duplicate(file_name, drive_folder_id):
+                logging.debug(f"File '{file_name}' already exists in Drive, skipping...")
                 return True
-            
+
             # Determine MIME type
-            mime_type, _ = mimetypes.guess_type(file_path)
-            if mime_type is None:
-                mime_type = 'application/octet-stream'
+            mime_type = _mime_for_suffix(os.path.splitext(file_path)[1].lower())
             
             # File metadata
             file_metadata = {
@@ -168,16 +829,37 @@ class GoogleDriveUploadBot:
                 'parents': [drive_folder_id]
             }
             
-            # Upload file
-            media = MediaFileUpload(file_path, mimetype=mime_type, resumable=True)
-            
-            file_obj = self.service.files().create(
-                body=file_metadata,
-                media_body=media,
-                fields='id'
-            ).execute()
-            
-            logging.info(f"Successfully uploaded: {file_name} (ID: {file_obj.get('id')})")
+            # Pace API writes so concurrent workers stay under quota
+            self._limiter.acquire()
+
+            # Upload file: small files go up in a single multipart request,
+            # large files use a resumable session with big chunks so the
+            # per-chunk commit round-trips stay rare
+            file_size = os.path.getsize(file_path)
+            if file_size < self.resumable_threshold:
+                media = MediaFileUpload(file_path, mimetype=mime_type, resumable=False)
+                file_obj = self._retry(service.files().create(
+                    body=file_metadata,
+                    media_body=media,
+                    fields='id'
+                ).execute)
+            else:
+                media = MediaFileUpload(file_path, mimetype=mime_type,
+                                        chunksize=self.upload_chunksize, resumable=True)
+                request = service.files().create(
+                    body=file_metadata,
+                    media_body=media,
+                    fields='id'
+                )
+                file_obj = None
+                while file_obj is None:
+                    status, file_obj = self._retry(request.next_chunk)
+                    if status:
+                        logging.debug(f"Uploading {file_name}: {int(status.progress() * 100)}%")
+
+            self._record_uploaded(drive_folder_id, file_name)
+
+            logging.debug(f"Successfully uploaded: {file_name} (ID: {file_obj.get('id')})")
             return True
             
         except Exception as e:
@@ -187,13 +869,9 @@ class GoogleDriveUploadBot:
     def upload_with_breaks(self, local_folder_path, drive_folder_name=None, drive_folder_id=None, file_extensions=None):
         """Upload files with breaks after every batch"""
         try:
-            # Get files to upload
-            files_to_upload = self.get_files_to_upload(local_folder_path, file_extensions)
-            
-            if not files_to_upload:
-                logging.info("No files to upload")
-                return
-            
+            if not os.path.exists(local_folder_path):
+                raise FileNotFoundError(f"Local folder '{local_folder_path}' not found!")
+
             # Use existing folder ID if provided, otherwise create/get folder by name
             target_folder_id = 'root'
             if drive_folder_id:
@@ -204,28 +882,74 @@ class GoogleDriveUploadBot:
                 if not target_folder_id:
                     logging.error("Failed to create destination folder")
                     return
-            
-            total_files = len(files_to_upload)
-            successful_uploads = 0
-            failed_uploads = 0
+
+            # Fetch existing file names once so per-file duplicate
+            # checks don't need their own API calls
+            self._prefetch_existing(target_folder_id)
+
+            # Bounded queue keeps the walk a little ahead of the uploads
+            # without materializing the whole tree in memory
+            work_queue = queue.Queue(maxsize=2 * self.batch_size)
+            sentinel = object()
+            stop_event = threading.Event()
+            counters = {'total': 0, 'success': 0, 'failed': 0}
+            counter_lock = threading.Lock()
             start_time = time.time()
-            
-            logging.info(f"Starting upload of {total_files} files...")
-            
-            for i, file_path in enumerate(files_to_upload):
-                # Upload file
-                if self.upload_file(str(file_path), target_folder_id):
-                    successful_uploads += 1
-                    self.uploaded_count += 1
-                else:
-                    failed_uploads += 1
-                
-                # Take break after every batch
-                if self.uploaded_count % self.batch_size == 0 and i < total_files - 1:
-                    logging.info(f"Uploaded {self.batch_size} files. Taking a {self.break_duration} second break...")
-                    time.sleep(self.break_duration)
-                    logging.info("Resuming uploads...")
-            
+
+            logging.info(f"Starting upload with {self.max_workers} workers...")
+
+            def worker():
+                while True:
+                    item = work_queue.get()
+                    if item is sentinel:
+                        break
+                    if stop_event.is_set():
+                        # Keep draining so the producer can reach its
+                        # sentinels instead of blocking on a full queue
+                        continue
+                    uploaded = self.upload_file(str(item), target_folder_id)
+                    with counter_lock:
+                        counters['total'] += 1
+                        if uploaded:
+                            counters['success'] += 1
+                            self.uploaded_count += 1
+                        else:
+                            counters['failed'] += 1
+                        processed = counters['total']
+                    # Periodic progress since there is no known total up front
+                    if processed % 100 == 0:
+                        logging.info(f"Processed {processed} files so far...")
+
+            producer = threading.Thread(
+                target=self._walk_producer,
+                args=(local_folder_path, file_extensions, work_queue, sentinel, stop_event),
+                daemon=True
+            )
+            producer.start()
+
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                workers = [executor.submit(worker) for _ in range(self.max_workers)]
+                try:
+                    for future in as_completed(workers):
+                        future.result()
+                except KeyboardInterrupt:
+                    # Signal before the executor's shutdown(wait=True) runs,
+                    # or it would block until the whole tree was uploaded
+                    stop_event.set()
+                    raise
+            producer.join()
+
+            total_files = counters['total']
+            successful_uploads = counters['success']
+            failed_uploads = counters['failed']
+
+            if total_files == 0:
+                logging.info("No files to upload")
+                return
+
+            # Final Bloom checkpoint so the next run starts warm
+            self._save_bloom(target_folder_id)
+
             # Calculate elapsed time
             elapsed_time = time.time() - start_time
             hours, remainder = divmod(elapsed_time, 3600)
@@ -246,6 +970,38 @@ class GoogleDriveUploadBot:
         except Exception as e:
             logging.error(f"An error occurred: {str(e)}")
 
+    def upload_async(self, local_folder_path, drive_folder_id='root', file_extensions=None,
+                     max_concurrency=32):
+        """Upload a folder through the asyncio/aiohttp path.
+
+        Alternative to upload_with_breaks for workloads dominated by
+        many small files; requires the optional aiohttp dependency.
+        Uses the same prefetched duplicate detection as the sync path,
+        so already-uploaded files are skipped, not re-uploaded.
+        """
+        self._prefetch_existing(drive_folder_id)
+
+        file_paths = []
+        skipped = 0
+        for file_path in self.iter_files_to_upload(local_folder_path, file_extensions):
+            if self._known_duplicate(os.path.basename(str(file_path)), drive_folder_id):
+                skipped += 1
+            else:
+                file_paths.append(file_path)
+        if skipped:
+            logging.info(f"Skipping {skipped} files that already exist in Drive")
+        if not file_paths:
+            logging.info("No files to upload")
+            return 0, 0
+
+        uploader = AsyncDriveUploader(
+            self.creds, max_concurrency=max_concurrency,
+            on_success=lambda name: self._record_uploaded(drive_folder_id, name))
+        successes, failures = asyncio.run(uploader.upload_all(file_paths, drive_folder_id))
+        self._save_bloom(drive_folder_id)
+        logging.info(f"Async upload finished: {successes} succeeded, {failures} failed")
+        return successes, failures
+
 
 def main():
     # Configuration